@@ -9,11 +9,15 @@ In CrateDB, tables for storing retention policies need to be created once manual
 See the file setup/data_retention_schema.sql in this repository.
 """
 
-from pathlib import Path
 import pendulum
-from airflow.providers.common.sql.operators.sql import SQLExecuteQueryOperator
-from airflow.providers.postgres.hooks.postgres import PostgresHook
 from airflow.decorators import dag, task
+from include.data_retention import (
+    MAX_ACTIVE_TASKS,
+    apply_policies,
+    get_retention_cursor,
+    group_by_table,
+    read_policies_sql,
+)
 
 
 def map_policy(policy):
@@ -26,13 +30,16 @@ def map_policy(policy):
 
 @task
 def get_policies(ds=None):
-    """Retrieve all partitions effected by a policy"""
-    pg_hook = PostgresHook(postgres_conn_id="cratedb_connection")
-    sql = Path("include/data_retention_retrieve_delete_policies.sql")
-    return pg_hook.get_records(
-        sql=sql.read_text(encoding="utf-8"),
-        parameters={"day": ds},
-    )
+    """Retrieve all partitions effected by a policy, grouped by table"""
+    with get_retention_cursor("delete") as cursor:
+        cursor.execute(read_policies_sql("delete"), {"day": ds})
+        return group_by_table(map_policy(row) for row in cursor.fetchall())
+
+
+@task(max_active_tis_per_dag=MAX_ACTIVE_TASKS)
+def delete_partitions(policies):
+    """Drop a table's expired partitions, reusing one connection for all statements"""
+    apply_policies("delete", policies)
 
 
 @dag(
@@ -41,11 +48,7 @@ def get_policies(ds=None):
     catchup=False,
 )
 def data_retention_delete():
-    SQLExecuteQueryOperator.partial(
-        task_id="delete_partition",
-        conn_id="cratedb_connection",
-        sql="DELETE FROM {{params.table_fqn}} WHERE {{params.column}} = {{params.value}};",
-    ).expand(params=get_policies().map(map_policy))
+    delete_partitions.expand(policies=get_policies())
 
 
 data_retention_delete()
@@ -10,22 +10,23 @@ Prerequisites
   CrateDB. See the file setup/data_retention_schema.sql in this repository.
 """
 
-from pathlib import Path
 import pendulum
-from airflow.providers.common.sql.operators.sql import SQLExecuteQueryOperator
-from airflow.providers.postgres.hooks.postgres import PostgresHook
 from airflow.decorators import dag, task
+from include.data_retention import (
+    MAX_ACTIVE_TASKS,
+    apply_policies,
+    get_retention_cursor,
+    group_by_table,
+    read_policies_sql,
+)
 
 
 @task
 def get_policies(ds=None):
-    """Retrieve all partitions effected by a policy"""
-    pg_hook = PostgresHook(postgres_conn_id="cratedb_connection")
-    sql = Path("include/data_retention_retrieve_reallocate_policies.sql")
-    return pg_hook.get_records(
-        sql=sql.read_text(encoding="utf-8"),
-        parameters={"day": ds},
-    )
+    """Retrieve all partitions effected by a policy, grouped by table"""
+    with get_retention_cursor("reallocate") as cursor:
+        cursor.execute(read_policies_sql("reallocate"), {"day": ds})
+        return group_by_table(map_policy(row) for row in cursor.fetchall())
 
 
 def map_policy(policy):
@@ -41,6 +42,12 @@ def map_policy(policy):
     }
 
 
+@task(max_active_tis_per_dag=MAX_ACTIVE_TASKS)
+def reallocate_partitions(policies):
+    """Reallocate a table's cold partitions, reusing one connection for all statements"""
+    apply_policies("reallocate", policies)
+
+
 @dag(
     start_date=pendulum.datetime(2021, 11, 19, tz="UTC"),
     schedule="@daily",
@@ -48,14 +55,7 @@ def map_policy(policy):
     template_searchpath=["include"],
 )
 def data_retention_reallocate():
-    SQLExecuteQueryOperator.partial(
-        task_id="reallocate_partitions",
-        conn_id="cratedb_connection",
-        sql="""
-            ALTER TABLE {{params.table_fqn}} PARTITION ({{params.column}} = {{params.value}})
-            SET ("routing.allocation.require.{{params.attribute_name}}" = '{{params.attribute_value}}');
-            """,
-    ).expand(params=get_policies().map(map_policy))
+    reallocate_partitions.expand(policies=get_policies())
 
 
 data_retention_reallocate()
@@ -9,21 +9,23 @@ In CrateDB, tables for storing retention policies need to be created once manual
 See the file setup/data_retention_schema.sql in this repository.
 """
 
-from pathlib import Path
 import pendulum
-from airflow.providers.common.sql.operators.sql import SQLExecuteQueryOperator
-from airflow.providers.postgres.hooks.postgres import PostgresHook
 from airflow.decorators import dag, task
+from include.data_retention import (
+    MAX_ACTIVE_TASKS,
+    apply_policies,
+    get_retention_cursor,
+    group_by_table,
+    read_policies_sql,
+)
 
 
 @task
 def get_policies(ds=None):
-    """Retrieve all partitions effected by a policy"""
-    pg_hook = PostgresHook(postgres_conn_id="cratedb_connection")
-    sql = Path("include/data_retention_retrieve_snapshot_policies.sql")
-    return pg_hook.get_records(
-        sql=sql.read_text(encoding="utf-8"), parameters={"day": ds}
-    )
+    """Retrieve all partitions effected by a policy, grouped by table"""
+    with get_retention_cursor("snapshot") as cursor:
+        cursor.execute(read_policies_sql("snapshot"), {"day": ds})
+        return group_by_table(map_policy(row) for row in cursor.fetchall())
 
 
 def map_policy(policy):
@@ -38,31 +40,19 @@ def map_policy(policy):
     }
 
 
+@task(max_active_tis_per_dag=MAX_ACTIVE_TASKS)
+def snapshot_partitions(policies):
+    """Snapshot and then drop a table's expired partitions over one connection"""
+    apply_policies("snapshot", policies)
+
+
 @dag(
     start_date=pendulum.datetime(2021, 11, 19, tz="UTC"),
     schedule="@daily",
     catchup=False,
 )
 def data_retention_snapshot():
-    policies = get_policies().map(map_policy)
-
-    reallocate = SQLExecuteQueryOperator.partial(
-        task_id="snapshot_partitions",
-        conn_id="cratedb_connection",
-        sql="""
-            CREATE SNAPSHOT {{params.target_repository_name}}."{{params.schema}}.{{params.table}}-{{params.value}}"
-            TABLE {{params.table_fqn}} PARTITION ({{params.column}} = {{params.value}})
-            WITH ("wait_for_completion" = true);
-            """,
-    ).expand(params=policies)
-
-    delete = SQLExecuteQueryOperator.partial(
-        task_id="delete_partitions",
-        conn_id="cratedb_connection",
-        sql="DELETE FROM {{params.table_fqn}} WHERE {{params.column}} = {{params.value}};",
-    ).expand(params=policies)
-
-    reallocate >> delete
+    snapshot_partitions.expand(policies=get_policies())
 
 
 data_retention_snapshot()
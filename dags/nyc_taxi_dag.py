@@ -85,24 +85,29 @@ def taskflow():
         replace=True,
     )
 
-    copy_csv_staging = SQLExecuteQueryOperator(
-        task_id="copy_csv_staging",
+    # Loading the file runs as one task over a single connection. Its session is
+    # named after the DAG and allows the monthly import to run for two hours.
+    # Purging the staging table first clears leftovers of a failed attempt.
+    load_csv_to_trips = SQLExecuteQueryOperator(
+        task_id="load_csv_to_trips",
         conn_id="cratedb_connection",
         # pylint: disable=C0301
-        sql=f"""
+        sql=[
+            "SET SESSION application_name = 'airflow-nyc-taxi-parquet';",
+            "SET SESSION statement_timeout = '2h';",
+            "DELETE FROM nyc_taxi.load_trips_staging;",
+            f"""
                 COPY nyc_taxi.load_trips_staging
                 FROM 's3://{ACCESS_KEY_ID}:{SECRET_ACCESS_KEY}@{S3_BUCKET}/{formatted_file_date}.csv'
                 WITH (format = 'csv', empty_string_as_null = true)
                 RETURN SUMMARY;
             """,
+            "REFRESH TABLE nyc_taxi.load_trips_staging;",
+            "taxi-insert.sql",
+        ],
     )
 
-    copy_staging_to_trips = SQLExecuteQueryOperator(
-        task_id="copy_staging_to_trips",
-        conn_id="cratedb_connection",
-        sql="taxi-insert.sql",
-    )
-
+    # A separate task, so that retrying the cleanup does not load the file again
     delete_staging = SQLExecuteQueryOperator(
         task_id="delete_staging",
         conn_id="cratedb_connection",
@@ -125,8 +130,7 @@ def taskflow():
         formatted_file_date,
         process_parquet,
         copy_csv_to_s3,
-        copy_csv_staging,
-        copy_staging_to_trips,
+        load_csv_to_trips,
         delete_staging,
         delete_local_parquet_csv,
     )
@@ -0,0 +1,68 @@
+"""Connections to CrateDB with per-DAG session settings
+
+Tasks open a single psycopg2 connection from the cratedb_connection, built the
+same way as PostgresHook.get_conn() does. Sessions are named after their DAG
+and bound the runtime of each statement. When many tasks write concurrently,
+consider placing PgBouncer in front of CrateDB.
+"""
+
+import contextlib
+import psycopg2
+from airflow.providers.postgres.hooks.postgres import PostgresHook
+
+# Default upper bound for the runtime of a single statement, in milliseconds
+STATEMENT_TIMEOUT = 600000
+
+# Extras interpreted by PostgresHook itself, which psycopg2 does not accept
+HOOK_EXTRAS = {
+    "iam",
+    "redshift",
+    "redshift-serverless",
+    "cursor",
+    "cluster-identifier",
+    "workgroup-name",
+    "aws_conn_id",
+    "sqlalchemy_scheme",
+    "sqlalchemy_query",
+}
+
+
+def connection_args(application_name, statement_timeout=STATEMENT_TIMEOUT):
+    """Build the psycopg2 arguments (a statement_timeout of 0 disables it)"""
+    conn = PostgresHook.get_connection("cratedb_connection")
+    args = {
+        "host": conn.host,
+        "user": conn.login,
+        "password": conn.password,
+        "dbname": conn.schema,
+        "port": conn.port,
+    }
+    for name, value in conn.extra_dejson.items():
+        if name not in HOOK_EXTRAS:
+            args[name] = value
+
+    # identifies the DAG's sessions on the server
+    args["application_name"] = application_name
+    # turns runaway statements into failures instead of occupying a slot.
+    # Appended to options of the connection, so it takes precedence over a
+    # statement_timeout set there, while other options are kept.
+    timeout_option = f"-c statement_timeout={statement_timeout}"
+    args["options"] = " ".join(filter(None, [args.get("options"), timeout_option]))
+    # keeps connections waiting on long-running statements alive behind NAT
+    args.setdefault("keepalives_idle", 60)
+    return args
+
+
+@contextlib.contextmanager
+def get_cursor(application_name, statement_timeout=STATEMENT_TIMEOUT):
+    """Open a connection for the calling task and yield a cursor, closing it afterwards"""
+    connection = psycopg2.connect(
+        **connection_args(application_name, statement_timeout)
+    )
+    # CrateDB has no transactions, so statements are not wrapped in any
+    connection.autocommit = True
+    try:
+        with connection.cursor() as cursor:
+            yield cursor
+    finally:
+        connection.close()
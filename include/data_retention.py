@@ -0,0 +1,80 @@
+"Shared helpers for the data_retention_* DAGs"
+import logging
+from pathlib import Path
+from include.cratedb import STATEMENT_TIMEOUT, get_cursor
+
+# Upper bound of concurrently running mapped tasks per DAG, limiting load on CrateDB
+MAX_ACTIVE_TASKS = 4
+
+# The condition matches the partition value exactly, so CrateDB drops the
+# whole partition instead of deleting row by row. No chunking is needed.
+DELETE_PARTITION = "DELETE FROM {table_fqn} WHERE {column} = {value};"
+
+# Per strategy, the statement templates applied to one partition (filled from a
+# policy) and the timeout of each statement in milliseconds (0 disables it)
+STRATEGIES = {
+    "delete": {
+        "statements": [DELETE_PARTITION],
+        "statement_timeout": STATEMENT_TIMEOUT,
+    },
+    "reallocate": {
+        "statements": [
+            """
+            ALTER TABLE {table_fqn} PARTITION ({column} = {value})
+            SET ("routing.allocation.require.{attribute_name}" = '{attribute_value}');
+            """
+        ],
+        "statement_timeout": STATEMENT_TIMEOUT,
+    },
+    "snapshot": {
+        "statements": [
+            """
+            CREATE SNAPSHOT {target_repository_name}."{schema}.{table}-{value}"
+            TABLE {table_fqn} PARTITION ({column} = {value})
+            WITH ("wait_for_completion" = true);
+            """,
+            DELETE_PARTITION,
+        ],
+        # snapshots wait for their completion, which may legitimately take longer
+        "statement_timeout": 0,
+    },
+}
+
+
+def read_policies_sql(strategy):
+    """Read the query retrieving partitions affected by a strategy"""
+    sql = Path(f"include/data_retention_retrieve_{strategy}_policies.sql")
+    return sql.read_text(encoding="utf-8")
+
+
+def group_by_table(policies):
+    """Group policies by table, as partitions of different tables are independent"""
+    groups = {}
+    for policy in policies:
+        groups.setdefault(policy["table_fqn"], []).append(policy)
+    return list(groups.values())
+
+
+def get_retention_cursor(strategy):
+    """Return a cursor for a strategy, with its session named after its DAG"""
+    return get_cursor(
+        f"airflow-data_retention_{strategy}",
+        STRATEGIES[strategy]["statement_timeout"],
+    )
+
+
+def apply_policies(strategy, policies):
+    """Apply a strategy to all policies' partitions over a single connection"""
+    # a partition's statements stay adjacent, e.g. it is only deleted right
+    # after its snapshot completed successfully
+    templates = STRATEGIES[strategy]["statements"]
+    statements = [
+        template.format_map(policy) for policy in policies for template in templates
+    ]
+    if not statements:
+        logging.info("No partitions affected, nothing to execute")
+        return
+
+    with get_retention_cursor(strategy) as cursor:
+        for statement in statements:
+            cursor.execute(statement)
@@ -0,0 +1,92 @@
+"Data handling for the financial_data_import DAG, imported lazily by its tasks"
+import io
+import logging
+import requests
+import pandas as pd
+import yfinance as yf
+from psycopg2.extras import execute_values
+from include.cratedb import get_cursor
+
+# Number of concurrent ticker downloads, independent of the worker's CPU count
+DOWNLOAD_THREADS = 16
+# Number of rows sent per multi-row INSERT statement
+INSERT_BATCH_SIZE = 5000
+
+
+def get_sp500_ticker_symbols():
+    """Extracts S&P 500 companies' tickers from the S&P 500's wikipedia page"""
+
+    # Getting the html code from S&P 500 wikipedia page
+    url = "https://en.wikipedia.org/wiki/List_of_S%26P_500_companies"
+    r_html = requests.get(url, timeout=2.5).text
+
+    # The stock tickers are found in the "Symbol" column of a table in the
+    # wikipedia page, whose html "id" attribute is "constituents".
+    # When given, a '.' (wikipedia notation) is replaced with a '-'
+    # (yfinance notation).
+    table = pd.read_html(io.StringIO(r_html), attrs={"id": "constituents"})[0]
+    return table["Symbol"].str.replace(".", "-", regex=False).tolist()
+
+
+def download_adjusted_close(tickers, start):
+    """Downloads Adjusted Close data of the given tickers"""
+
+    # auto_adjust=False keeps the "Adj Close" column, which recent yfinance
+    # versions otherwise drop in favor of adjusting "Close" in place
+    data = yf.download(
+        tickers,
+        start=start,
+        group_by="column",
+        auto_adjust=False,
+        threads=DOWNLOAD_THREADS,
+        progress=False,
+    )
+    # adjusted_close is a FLOAT (single precision) column, so float32 loses
+    # nothing and halves the size of the data passed on.
+    return data["Adj Close"].astype("float32")
+
+
+def prepare_values(data):
+    """Creates a DataFrame with clean data values, one row per closing date and ticker"""
+
+    # formatting the dates on the index also works for the empty frame
+    # returned on non-trading days, whose index is not a DatetimeIndex
+    closing_dates = pd.to_datetime(data.index).strftime("%Y-%m-%d")
+
+    # reshaping to one row per ticker and closing date
+    values = (
+        data.set_axis(closing_dates)
+        .rename_axis("closing_date")
+        .reset_index()
+        .melt(id_vars="closing_date", var_name="ticker", value_name="adj_close")
+    )
+
+    invalid = values["adj_close"].isna()
+    if invalid.any():
+        logging.info(
+            "Skipping %d values with invalid adj_close, affected tickers: %s",
+            invalid.sum(),
+            ", ".join(values.loc[invalid, "ticker"].unique()),
+        )
+
+    return values[~invalid].reset_index(drop=True)
+
+
+def insert_values(values):
+    """Upserts the values in batches of parameterized multi-row INSERTs"""
+
+    with get_cursor("airflow-financial_data_import") as cursor:
+        execute_values(
+            cursor,
+            """
+            INSERT INTO doc.sp500 (closing_date, ticker, adjusted_close)
+            VALUES %s
+            ON CONFLICT (closing_date, ticker)
+            DO UPDATE SET adjusted_close = excluded.adjusted_close
+            """,
+            # plain tuples are generated lazily, page by page
+            values[["closing_date", "ticker", "adj_close"]].itertuples(
+                index=False, name=None
+            ),
+            page_size=INSERT_BATCH_SIZE,
+        )
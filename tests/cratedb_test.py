@@ -0,0 +1,35 @@
+"Tests for the CrateDB connection arguments"
+import types
+from include import cratedb
+
+
+def test_connection_args(monkeypatch):
+    connection = types.SimpleNamespace(
+        host="localhost",
+        login="crate",
+        password="secret",
+        schema="doc",
+        port=5432,
+        extra_dejson={
+            "sslmode": "require",
+            "cursor": "dictcursor",
+            "keepalives": 1,
+            "options": "-c search_path=doc",
+        },
+    )
+    monkeypatch.setattr(
+        cratedb.PostgresHook, "get_connection", lambda conn_id: connection
+    )
+
+    assert cratedb.connection_args("airflow-test", 1000) == {
+        "host": "localhost",
+        "user": "crate",
+        "password": "secret",
+        "dbname": "doc",
+        "port": 5432,
+        "sslmode": "require",
+        "keepalives": 1,
+        "application_name": "airflow-test",
+        "options": "-c search_path=doc -c statement_timeout=1000",
+        "keepalives_idle": 60,
+    }
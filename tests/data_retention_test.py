@@ -0,0 +1,57 @@
+"Tests for the statements generated by the data_retention_* DAGs"
+import contextlib
+import types
+import pytest
+from include import data_retention
+
+
+def snapshot_policy(value):
+    return {
+        "schema": "doc",
+        "table": "metrics",
+        "table_fqn": '"doc"."metrics"',
+        "column": '"ts_day"',
+        "value": value,
+        "target_repository_name": "backup",
+    }
+
+
+@pytest.fixture(name="executed")
+def fixture_executed(monkeypatch):
+    """Replace the database cursor, recording the statements and opened cursors"""
+    executed = {"cursors": 0, "statements": []}
+
+    def execute(statement):
+        executed["statements"].append(" ".join(statement.split()))
+
+    @contextlib.contextmanager
+    def get_cursor(*_args):
+        executed["cursors"] += 1
+        yield types.SimpleNamespace(execute=execute)
+
+    monkeypatch.setattr(data_retention, "get_cursor", get_cursor)
+    return executed
+
+
+def test_snapshot_deletes_each_partition_after_its_snapshot(executed):
+    data_retention.apply_policies(
+        "snapshot", [snapshot_policy(1672531200000), snapshot_policy(1672617600000)]
+    )
+
+    assert executed["cursors"] == 1
+    assert executed["statements"] == [
+        'CREATE SNAPSHOT backup."doc.metrics-1672531200000" '
+        'TABLE "doc"."metrics" PARTITION ("ts_day" = 1672531200000) '
+        'WITH ("wait_for_completion" = true);',
+        'DELETE FROM "doc"."metrics" WHERE "ts_day" = 1672531200000;',
+        'CREATE SNAPSHOT backup."doc.metrics-1672617600000" '
+        'TABLE "doc"."metrics" PARTITION ("ts_day" = 1672617600000) '
+        'WITH ("wait_for_completion" = true);',
+        'DELETE FROM "doc"."metrics" WHERE "ts_day" = 1672617600000;',
+    ]
+
+
+def test_no_policies_execute_nothing(executed):
+    data_retention.apply_policies("snapshot", [])
+
+    assert executed == {"cursors": 0, "statements": []}
@@ -0,0 +1,66 @@
+"Tests for the data handling of the financial_data_import DAG"
+import contextlib
+import math
+import pandas as pd
+from include import financial_data
+from include.financial_data import INSERT_BATCH_SIZE, insert_values, prepare_values
+
+
+def test_prepare_values():
+    data = pd.DataFrame(
+        {"AAPL": [1.5, 1.75], "MSFT": [2.5, 2.75], "NVDA": [math.nan, 3.5]},
+        index=pd.DatetimeIndex(["2024-01-02", "2024-01-03"], name="Date"),
+    )
+
+    values = prepare_values(data)
+
+    assert values.to_dict(orient="records") == [
+        {"closing_date": "2024-01-02", "ticker": "AAPL", "adj_close": 1.5},
+        {"closing_date": "2024-01-03", "ticker": "AAPL", "adj_close": 1.75},
+        {"closing_date": "2024-01-02", "ticker": "MSFT", "adj_close": 2.5},
+        {"closing_date": "2024-01-03", "ticker": "MSFT", "adj_close": 2.75},
+        {"closing_date": "2024-01-03", "ticker": "NVDA", "adj_close": 3.5},
+    ]
+    assert list(values.index) == [0, 1, 2, 3, 4]
+
+
+def test_prepare_values_empty():
+    values = prepare_values(pd.DataFrame())
+
+    assert values.empty
+    assert list(values.columns) == ["closing_date", "ticker", "adj_close"]
+
+
+def test_insert_values(monkeypatch):
+    executed = {}
+    cursor = object()
+
+    @contextlib.contextmanager
+    def get_cursor(application_name):
+        executed["application_name"] = application_name
+        yield cursor
+
+    def execute_values(cur, sql, argslist, page_size):
+        executed.update(cursor=cur, sql=" ".join(sql.split()), page_size=page_size)
+        executed["rows"] = list(argslist)
+
+    monkeypatch.setattr(financial_data, "get_cursor", get_cursor)
+    monkeypatch.setattr(financial_data, "execute_values", execute_values)
+
+    # float32, as returned by download_adjusted_close
+    data = pd.DataFrame(
+        {"AAPL": [1.5], "MSFT": [math.nan]},
+        index=pd.DatetimeIndex(["2024-01-02"], name="Date"),
+    ).astype("float32")
+    insert_values(prepare_values(data))
+
+    assert executed["application_name"] == "airflow-financial_data_import"
+    assert executed["cursor"] is cursor
+    assert executed["sql"] == (
+        "INSERT INTO doc.sp500 (closing_date, ticker, adjusted_close) VALUES %s "
+        "ON CONFLICT (closing_date, ticker) "
+        "DO UPDATE SET adjusted_close = excluded.adjusted_close"
+    )
+    assert executed["page_size"] == INSERT_BATCH_SIZE
+    assert executed["rows"] == [("2024-01-02", "AAPL", 1.5)]
+    assert [type(value) for value in executed["rows"][0]] == [str, str, float]